@@ -14,17 +14,30 @@ Implementations of Bayesian conjugate priors & their online update rules.
     MVNormInvWishart
     BayesianLinReg
     BayesianMVLinReg
+
+The update rules (and posterior PDFs where applicable) of `BetaBernoulli`, `NormInvGamma`, and `MVNormInvWishart`
+are also exposed as ``numba``-compiled functions, which operate on tuples of parameters. These can be called from
+user code which is itself compiled with ``numba``, e.g. a change point detection loop.
+
+.. autosummary::
+    beta_bernoulli_update
+    beta_bernoulli_logpdf
+    nig_update
+    nig_logpdf
+    mvniw_update
 """
+
 from abc import ABC, abstractmethod
 import copy
 import logging
+import math
 from typing import Tuple
 
+from numba import njit
 import numpy as np
 import pandas as pd
 import scipy
 from scipy.special import gammaln, multigammaln
-from scipy.linalg import pinv, pinvh
 from scipy.stats import bernoulli, beta, invgamma, invwishart, norm, multivariate_normal as mvnorm, t as student_t
 
 from merlion.utils import TimeSeries, UnivariateTimeSeries, to_timestamp, to_pd_datetime
@@ -36,12 +49,6 @@ try:
 except ImportError:
     logger.warning("Scipy version <1.6.0 installed. No support for multivariate t density.")
     mvt = None
-    sp_pinv = pinv
-
-    # Redefine pinv to implement an optimization from more recent scipy
-    # Specifically, if the matrix is tall enough, it's easier to compute pinv with the transpose
-    def pinv(a):
-        return sp_pinv(a.T).T if a.shape[0] / a.shape[1] >= 1.1 else sp_pinv(a)
 
 
 _epsilon = 1e-8
@@ -55,9 +62,11 @@ def _log_pdet(a):
     return np.sum(np.log(eigval[eigval > 0]))
 
 
-def _mvt_pdf(x, mu, Sigma, nu, log=True):
+def _psd_pinv_sqrt(Sigma):
     """
-    (log) PDF of multivariate t distribution. Use as a fallback when scipy >= 1.6.0 isn't available.
+    Square root of the pseudo-inverse of a (possibly singular) PSD matrix Sigma, as well as its log
+    pseudo-determinant and rank. Singular values are treated the same way as ``scipy.stats`` does when
+    ``allow_singular=True``.
     """
     # Compute the spectrum of Sigma
     eigval, eigvec = np.linalg.eigh(Sigma)
@@ -70,11 +79,20 @@ def _mvt_pdf(x, mu, Sigma, nu, log=True):
     # Compute the log pseudo-determinant of Sigma
     positive_eigval = eigval[eigval > eps]
     log_pdet = np.sum(np.log(positive_eigval))
-    dim, rank = len(eigval), len(positive_eigval)
 
     # Compute the square root of the pseudo-inverse of Sigma
     inv_eigval = np.array([0 if lmbda < eps else 1 / lmbda for lmbda in eigval])
     pinv_sqrt = np.multiply(eigvec, np.sqrt(inv_eigval))
+    return pinv_sqrt, log_pdet, len(positive_eigval)
+
+
+def _mvt_pdf(x, mu, Sigma, nu, log=True):
+    """
+    (log) PDF of multivariate t distribution. Use as a fallback when scipy >= 1.6.0 isn't available, or as a fast
+    alternative to constructing a ``scipy.stats`` random variable when only the density is needed.
+    """
+    pinv_sqrt, log_pdet, rank = _psd_pinv_sqrt(Sigma)
+    dim = len(Sigma)
 
     # compute (x - \mu)^T \Sigma^{-1} (x - \mu)
     # To do this in batch with D = (x - mu) having shape [n, d],
@@ -90,6 +108,209 @@ def _mvt_pdf(x, mu, Sigma, nu, log=True):
     return a + b + c if log else np.exp(a + b + c)
 
 
+def _matrix_normal_logpdf(W, M, Lambda, Sigma):
+    r"""
+    Log PDF of a matrix normal distribution with mean ``M``, 2x2 row precision ``Lambda``, and column covariance
+    ``Sigma``, evaluated at ``W``. Equivalent to the log PDF of :math:`\mathcal{N}(\mathrm{vec}(M), \Sigma \otimes
+    \Lambda^{-1})` at :math:`\mathrm{vec}(W)`, without materializing the Kronecker product. ``Sigma`` may be
+    singular, in which case we use its pseudo-inverse and pseudo-determinant.
+    """
+    p = len(Lambda)
+    pinv_sqrt, log_pdet, rank = _psd_pinv_sqrt(Sigma)
+
+    # tr(Sigma^+ (W - M)^T Lambda (W - M)), where Sigma^+ = pinv_sqrt @ pinv_sqrt.T
+    delta = (W - M) @ pinv_sqrt  # [p, d]
+    quad_form = np.sum(delta * (Lambda @ delta))
+
+    logdet = p * log_pdet - rank * _logdet2x2(Lambda)
+    return -0.5 * (p * rank * np.log(2 * np.pi) + logdet + quad_form)
+
+
+def _design_matrix(t):
+    """
+    :return: the ``[n, 2]`` matrix obtained by stacking the times ``t`` with an all-ones column, i.e. ``[t, 1]``.
+    """
+    t_full = np.empty((len(t), 2))
+    t_full[:, 0] = t
+    t_full[:, 1] = 1
+    return t_full
+
+
+def _ts_to_numpy(x: TimeSeries):
+    """
+    :return: the ``[n, d]`` ``numpy`` array of values of the time series ``x``, read directly from its univariates.
+        We only align ``x`` if it isn't already aligned.
+    """
+    if not x.is_aligned:
+        x = x.align()
+    if x.dim == 0:
+        return x.to_pd().values
+    return np.stack([var.np_values for var in x.univariates], axis=-1)
+
+
+@njit(cache=True)
+def _t_logpdf(x, loc, scale2, df):
+    """
+    Log PDF of a univariate Student-t distribution with squared scale ``scale2``. Equivalent to
+    ``scipy.stats.t(df=df, loc=loc, scale=np.sqrt(scale2)).logpdf(x)``, without constructing a random variable.
+    ``loc``, ``scale2``, and ``df`` must be scalars.
+    """
+    a = math.lgamma(0.5 * (df + 1)) - math.lgamma(0.5 * df)
+    b = -0.5 * math.log(df * math.pi * scale2)
+    c = -0.5 * (df + 1) * np.log1p((x - loc) ** 2 / (df * scale2))
+    return a + b + c
+
+
+def _invgamma_logpdf(x, a, b):
+    """
+    Log PDF of an inverse gamma distribution. Equivalent to ``scipy.stats.invgamma(a=a, scale=b).logpdf(x)``,
+    without constructing a random variable.
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        logp = a * np.log(b) - gammaln(a) - (a + 1) * np.log(x) - b / x
+    return np.where(x > 0, logp, -np.inf)
+
+
+@njit(cache=True)
+def beta_bernoulli_update(state, x):
+    """
+    Numba-compiled update of a `BetaBernoulli` conjugate prior on binary data ``x``. Can be called from other
+    numba-compiled code.
+
+    :param state: the prior's parameters ``(n, alpha, beta)``
+    :return: the updated parameters ``(n, alpha, beta)``
+    """
+    n, alpha, beta = state
+    s = np.count_nonzero(x)
+    return n + len(x), alpha + s, beta + len(x) - s
+
+
+@njit(cache=True)
+def beta_bernoulli_logpdf(state, x):
+    """
+    Numba-compiled posterior log PDF of a `BetaBernoulli` conjugate prior at binary data ``x``. Can be called from
+    other numba-compiled code.
+
+    :param state: the prior's parameters ``(n, alpha, beta)``
+    :return: the posterior log PDF of each element of ``x``. Like ``scipy.stats.bernoulli.logpmf``, this is ``nan``
+        for ``nan`` inputs, and ``-inf`` for inputs other than 0 or 1.
+    """
+    n, alpha, beta = state
+    logp, log1mp = np.log(alpha / (alpha + beta)), np.log(beta / (alpha + beta))
+    ret = np.empty(len(x))
+    for i in range(len(x)):
+        if x[i] != x[i]:
+            ret[i] = np.nan
+        elif x[i] == 1:
+            ret[i] = logp
+        elif x[i] == 0:
+            ret[i] = log1mp
+        else:
+            ret[i] = -np.inf
+    return ret
+
+
+@njit(cache=True)
+def nig_update(state, x):
+    """
+    Numba-compiled update of a `NormInvGamma` conjugate prior on data ``x``. The sample mean & sum of squared
+    deviations from the mean are accumulated in a single pass over ``x`` using Welford's algorithm. Can be called
+    from other numba-compiled code.
+
+    :param state: the prior's parameters ``(n, mu_0, alpha, beta)``
+    :return: the updated parameters ``(n, mu_0, alpha, beta)``
+    """
+    n0, mu_0, alpha, beta = state
+    n = len(x)
+    xbar, sample_comp = 0.0, 0.0
+    for i in range(n):
+        delta = x[i] - xbar
+        xbar += delta / (i + 1)
+        sample_comp += delta * (x[i] - xbar)
+    n_new = n0 + n
+    prior_comp = n0 * n / n_new * (mu_0 - xbar) ** 2
+    mu_new = mu_0 * n0 / n_new + xbar * n / n_new
+    return n_new, mu_new, alpha + n / 2, beta + sample_comp / 2 + prior_comp / 2
+
+
+@njit(cache=True)
+def nig_logpdf(state, x):
+    """
+    Numba-compiled posterior log PDF of a `NormInvGamma` conjugate prior at data ``x``. Can be called from other
+    numba-compiled code.
+
+    :param state: the prior's parameters ``(n, mu_0, alpha, beta)``
+    :return: the posterior log PDF of each element of ``x``
+    """
+    n, mu_0, alpha, beta = state
+    scale2 = (beta * (2 * alpha + 1)) / (2 * alpha ** 2)
+    return _t_logpdf(x, mu_0, scale2, 2 * alpha)
+
+
+@njit(cache=True)
+def mvniw_update(state, x):
+    """
+    Numba-compiled update of a `MVNormInvWishart` conjugate prior on data ``x`` of shape ``[n, d]``. Can be called
+    from other numba-compiled code.
+
+    :param state: the prior's parameters ``(n, nu, Lambda, mu_0)``
+    :return: the updated parameters ``(n, nu, Lambda, mu_0)``
+    """
+    n0, nu, Lambda, mu_0 = state
+    n = x.shape[0]
+    n_new = n0 + n
+
+    # Scatter matrix of the new data about its own mean. We shift x by its first observation before computing the
+    # Gram matrix, so that the Gram matrix doesn't cancel catastrophically for data far from the origin.
+    shift = x[0]
+    x_shifted = x - shift
+    shifted_sum = np.sum(x_shifted, axis=0)
+    sample_mean = shift + shifted_sum / n
+    sample_scatter = x_shifted.T @ x_shifted - np.outer(shifted_sum, shifted_sum) / n
+
+    # Combine it with Lambda via the deviation of the sample mean from mu_0. Differencing the uncentered terms
+    # n_0 mu_0 mu_0^T and n_n mu_n mu_n^T instead would cancel catastrophically for data far from the origin.
+    delta = sample_mean - mu_0
+    Lambda_new = Lambda + sample_scatter + n0 * n / n_new * np.outer(delta, delta)
+    mu_new = mu_0 + delta * n / n_new
+    return n_new, nu + n, Lambda_new, mu_new
+
+
+@njit(cache=True)
+def _inv2x2(A):
+    """
+    Inverse of a symmetric positive semi-definite 2x2 matrix, written out in closed form. A small ridge is added to
+    the diagonal if the matrix is (numerically) singular.
+    """
+    a, b, c, d = A[0, 0], A[0, 1], A[1, 0], A[1, 1]
+    det = a * d - b * c
+    if det <= _epsilon * abs(a * d):
+        ridge = _epsilon * max(a + d, 1.0)
+        a, d = a + ridge, d + ridge
+        det = a * d - b * c
+    ret = np.empty((2, 2))
+    ret[0, 0], ret[0, 1], ret[1, 0], ret[1, 1] = d / det, -b / det, -c / det, a / det
+    return ret
+
+
+@njit(cache=True)
+def _logdet2x2(A):
+    """
+    Log determinant of a symmetric positive definite 2x2 matrix, written out in closed form.
+    """
+    return np.log(A[0, 0] * A[1, 1] - A[0, 1] * A[1, 0])
+
+
+@njit(cache=True)
+def _linreg_log_normalizer(alpha, beta):
+    """
+    The terms of the log normalizing constant of a Bayesian linear regression's Normal-InverseGamma posterior which
+    depend on ``alpha`` and ``beta``, i.e. all terms except the log determinant of the precision matrix and terms
+    which only depend on the number of observations.
+    """
+    return alpha * math.log(beta) - math.lgamma(alpha)
+
+
 class ConjPrior(ABC):
     """
     Abstract base class for a Bayesian conjugate prior.
@@ -109,7 +330,11 @@ class ConjPrior(ABC):
             self.update(sample)
 
     def to_dict(self):
-        return {k: v.tolist() if hasattr(v, "tolist") else copy.deepcopy(v) for k, v in self.__dict__.items()}
+        return {
+            k: v.tolist() if hasattr(v, "tolist") else copy.deepcopy(v)
+            for k, v in self.__dict__.items()
+            if not k.startswith("_")
+        }
 
     @classmethod
     def from_dict(cls, state_dict):
@@ -127,6 +352,15 @@ class ConjPrior(ABC):
     def __deepcopy__(self, memodict={}):
         return self.__copy__()
 
+    def _copy_with(self, **kwargs):
+        """
+        :return: a shallow copy of this conjugate prior, with the attributes given in ``kwargs`` replaced. This is a
+            cheap way to construct an updated conjugate prior from parameters computed without modifying ``self``.
+        """
+        ret = self.__class__.__new__(self.__class__)
+        ret.__dict__.update(self.__dict__, **kwargs)
+        return ret
+
     @staticmethod
     def get_time_series_values(x) -> np.ndarray:
         """
@@ -135,7 +369,7 @@ class ConjPrior(ABC):
         if x is None:
             return None
         if isinstance(x, TimeSeries):
-            x = x.align().to_pd().values
+            x = _ts_to_numpy(x)
         elif isinstance(x, tuple) and len(x) == 2:
             t, x = x
             x = np.asarray(x).reshape(1, -1)
@@ -179,7 +413,7 @@ class ConjPrior(ABC):
         if isinstance(x, TimeSeries):
             self.names = x.names
             t = x.np_time_stamps
-            x = x.align().to_pd().values
+            x = _ts_to_numpy(x)
         elif isinstance(x, tuple) and len(x) == 2:
             t, x = x
             t = np.asarray(t).reshape(1)
@@ -291,12 +525,15 @@ class BetaBernoulli(ScalarConjPrior):
         The posterior distribution of x is :math:`\mathrm{Bernoulli}(\alpha / (\alpha + \beta))`.
         """
         t, x_np = self.process_time_series(x)
-        rv = bernoulli(self.alpha / (self.alpha + self.beta))
-        ret = self._process_return(x=x_np, rv=rv, return_rv=return_rv, log=log)
+        if x is None or return_rv:
+            rv = bernoulli(self.alpha / (self.alpha + self.beta))
+            ret = self._process_return(x=x_np, rv=rv, return_rv=return_rv, log=log)
+        else:
+            logp = beta_bernoulli_logpdf((self.n, self.alpha, self.beta), x_np)
+            ret = logp if log else np.exp(logp)
         if return_updated:
-            updated = copy.deepcopy(self)
-            updated.update(x)
-            return ret, updated
+            n, alpha, beta = self._posterior_params(t, x_np)
+            return ret, self._copy_with(n=n, alpha=alpha, beta=beta)
         return ret
 
     def theta_posterior(self, theta, return_rv=False, log=True):
@@ -306,11 +543,16 @@ class BetaBernoulli(ScalarConjPrior):
         rv = beta(self.alpha, self.beta)
         return self._process_return(x=theta, rv=rv, return_rv=return_rv, log=log)
 
+    def _posterior_params(self, t, x):
+        """
+        :return: ``(n, alpha, beta)`` obtained by updating the model on the already processed data ``(t, x)``.
+            Does not modify the model itself.
+        """
+        return beta_bernoulli_update((self.n, self.alpha, self.beta), x)
+
     def update(self, x):
         t, x = self.process_time_series(x)
-        self.n += len(x)
-        self.alpha += x.sum()
-        self.beta += (1 - x).sum()
+        self.n, self.alpha, self.beta = self._posterior_params(t, x)
 
     def forecast(self, time_stamps) -> Tuple[TimeSeries, TimeSeries]:
         n = len(time_stamps)
@@ -354,45 +596,55 @@ class NormInvGamma(ScalarConjPrior):
         self.beta = _epsilon
         super().__init__(sample=sample)
 
+    def _posterior_params(self, t, x):
+        """
+        :return: ``(n, mu_0, alpha, beta)`` obtained by updating the model on the already processed data ``(t, x)``.
+            Does not modify the model itself.
+        """
+        return nig_update((self.n, self.mu_0, self.alpha, self.beta), x)
+
     def update(self, x):
         t, x = self.process_time_series(x)
-        n0, n = self.n, len(x)
-        self.alpha = self.alpha + n / 2
-        self.n = n0 + n
-
-        xbar = np.mean(x)
-        sample_comp = np.sum((x - xbar) ** 2)
-        prior_comp = n0 * n / (n0 + n) * (self.mu_0 - xbar) ** 2
-        self.beta = self.beta + sample_comp / 2 + prior_comp / 2
-        self.mu_0 = self.mu_0 * n0 / (n0 + n) + xbar * n / (n0 + n)
+        self.n, self.mu_0, self.alpha, self.beta = self._posterior_params(t, x)
 
     def mu_posterior(self, mu, return_rv=False, log=True):
         r"""
         The posterior for :math:`\mu` is :math:`\text{Student-t}_{2\alpha}(\mu_0, \beta / (n \alpha))`
         """
         scale = self.beta / (2 * self.alpha ** 2)
-        rv = student_t(loc=self.mu_0, scale=np.sqrt(scale), df=2 * self.alpha)
-        return self._process_return(x=mu, rv=rv, return_rv=return_rv, log=log)
+        if mu is None or return_rv:
+            rv = student_t(loc=self.mu_0, scale=np.sqrt(scale), df=2 * self.alpha)
+            return self._process_return(x=mu, rv=rv, return_rv=return_rv, log=log)
+        mu = np.asarray(mu, dtype=float)
+        logp = _t_logpdf(mu, float(self.mu_0), float(scale), float(2 * self.alpha)).reshape(len(mu))
+        return logp if log else np.exp(logp)
 
     def sigma2_posterior(self, sigma2, return_rv=False, log=True):
         r"""
         The posterior for :math:`\sigma^2` is :math:`\text{InvGamma}(\alpha, \beta)`.
         """
-        rv = invgamma(a=self.alpha, scale=self.beta)
-        return self._process_return(x=sigma2, rv=rv, return_rv=return_rv, log=log)
+        if sigma2 is None or return_rv:
+            rv = invgamma(a=self.alpha, scale=self.beta)
+            return self._process_return(x=sigma2, rv=rv, return_rv=return_rv, log=log)
+        sigma2 = np.asarray(sigma2)
+        logp = _invgamma_logpdf(sigma2, a=self.alpha, b=self.beta).reshape(len(sigma2))
+        return logp if log else np.exp(logp)
 
     def posterior(self, x, log=True, return_rv=False, return_updated=False):
         r"""
         The posterior for :math:`x` is :math:`\text{Student-t}_{2\alpha}(\mu_0, (n+1) \beta / (n \alpha))`
         """
         t, x_np = self.process_time_series(x)
-        scale = (self.beta * (2 * self.alpha + 1)) / (2 * self.alpha ** 2)
-        rv = student_t(loc=self.mu_0, scale=np.sqrt(scale), df=2 * self.alpha)
-        ret = self._process_return(x=x_np, rv=rv, return_rv=return_rv, log=log)
+        if x is None or return_rv:
+            scale = (self.beta * (2 * self.alpha + 1)) / (2 * self.alpha ** 2)
+            rv = student_t(loc=self.mu_0, scale=np.sqrt(scale), df=2 * self.alpha)
+            ret = self._process_return(x=x_np, rv=rv, return_rv=return_rv, log=log)
+        else:
+            logp = nig_logpdf((self.n, self.mu_0, self.alpha, self.beta), x_np)
+            ret = logp if log else np.exp(logp)
         if return_updated:
-            updated = copy.deepcopy(self)
-            updated.update(x)
-            return ret, updated
+            n, mu_0, alpha, beta = self._posterior_params(t, x_np)
+            return ret, self._copy_with(n=n, mu_0=mu_0, alpha=alpha, beta=beta)
         return ret
 
     def forecast(self, time_stamps) -> Tuple[TimeSeries, TimeSeries]:
@@ -441,6 +693,8 @@ class MVNormInvWishart(ConjPrior):
             return None, None
         t, x = super().process_time_series(x)
         n, d = x.shape
+        # Initialize any prior hyperparameters not set by the user, now that the dimension is known. Since n = 0 at
+        # this point, the prior mean mu_0 has no weight in the update rule, so the first update isn't special-cased.
         if self.nu == 0:
             self.nu = d + 2 * _epsilon
         if self.Lambda is None:
@@ -449,19 +703,17 @@ class MVNormInvWishart(ConjPrior):
             self.mu_0 = np.zeros(d)
         return t, x
 
+    def _posterior_params(self, t, x):
+        """
+        :return: ``(n, nu, Lambda, mu_0)`` obtained by updating the model on the already processed data ``(t, x)``.
+            Does not modify the model itself.
+        """
+        x = np.ascontiguousarray(x, dtype=float)
+        return mvniw_update((self.n, self.nu, self.Lambda, self.mu_0), x)
+
     def update(self, x):
         t, x = self.process_time_series(x)
-
-        n0 = self.n
-        n, d = x.shape
-        self.nu = self.nu + n
-
-        sample_mean = np.mean(x, axis=0)
-        sample_cov = (x - sample_mean).T @ (x - sample_mean)
-        delta = sample_mean - self.mu_0
-        self.Lambda = self.Lambda + sample_cov + n * n0 / (n + n0) * (delta.T @ delta)
-        self.mu_0 = self.mu_0 * n0 / (n0 + n) + sample_mean * n / (n0 + n)
-        self.n = n0 + n
+        self.n, self.nu, self.Lambda, self.mu_0 = self._posterior_params(t, x)
 
     def mu_posterior(self, mu, return_rv=False, log=True):
         r"""
@@ -469,16 +721,15 @@ class MVNormInvWishart(ConjPrior):
         """
         dof = self.nu - self.dim + 1
         shape = self.Lambda / (self.nu * dof)
-        if mvt is not None:
-            rv = mvt(shape=shape, loc=self.mu_0, df=dof, allow_singular=True)
-            return self._process_return(x=mu, rv=rv, return_rv=return_rv, log=log)
-        else:
-            if mu is None or return_rv:
+        if mu is None or return_rv:
+            if mvt is None:
                 raise ValueError(
                     f"The scipy version you have installed ({scipy.__version__}) does not support a multivariate-t "
                     f"random variable Please specify a non-``None`` value of ``mu`` and set ``return_rv = False``."
                 )
-            return _mvt_pdf(x=mu, mu=self.mu_0, Sigma=shape, nu=dof, log=log)
+            rv = mvt(shape=shape, loc=self.mu_0, df=dof, allow_singular=True)
+            return self._process_return(x=mu, rv=rv, return_rv=return_rv, log=log)
+        return _mvt_pdf(x=mu, mu=self.mu_0, Sigma=shape, nu=dof, log=log)
 
     def Sigma_posterior(self, sigma2, return_rv=False, log=True):
         r"""
@@ -494,21 +745,20 @@ class MVNormInvWishart(ConjPrior):
         t, x_np = self.process_time_series(x)
         dof = self.nu - self.dim + 1
         shape = self.Lambda * (self.nu + 1) / (self.nu * dof)
-        if mvt is not None:
-            rv = mvt(shape=shape, loc=self.mu_0, df=dof, allow_singular=True)
-            ret = self._process_return(x=x_np, rv=rv, return_rv=return_rv, log=log)
-        else:
-            if x is None or return_rv:
+        if x is None or return_rv:
+            if mvt is None:
                 raise ValueError(
                     f"The scipy version you have installed ({scipy.__version__}) does not support a multivariate-t "
                     f"random variable Please specify a non-``None`` value of ``x`` and set ``return_rv = False``."
                 )
+            rv = mvt(shape=shape, loc=self.mu_0, df=dof, allow_singular=True)
+            ret = self._process_return(x=x_np, rv=rv, return_rv=return_rv, log=log)
+        else:
             ret = _mvt_pdf(x=x_np, mu=self.mu_0, Sigma=shape, nu=dof, log=log)
 
         if return_updated:
-            updated = copy.deepcopy(self)
-            updated.update(x)
-            return ret, updated
+            n, nu, Lambda, mu_0 = self._posterior_params(t, x_np)
+            return ret, self._copy_with(n=n, nu=nu, Lambda=Lambda, mu_0=mu_0)
         return ret
 
     def forecast(self, time_stamps, name="forecast") -> Tuple[TimeSeries, TimeSeries]:
@@ -549,9 +799,8 @@ class BayesianLinReg(ConjPrior):
     .. math::
 
         \begin{align*}
-        w_{OLS} &= (T^T T)^{-1} T^T x \\
         \Lambda_n &= \Lambda_0 + T^T T \\
-        w_n &= (\Lambda_0 + T^T T)^{-1} (\Lambda_0 w_0 + T^T T w_{OLS}) \\
+        w_n &= (\Lambda_0 + T^T T)^{-1} (\Lambda_0 w_0 + T^T x) \\
         \alpha_n &= \alpha_0 + n / 2 \\
         \beta_n &= \beta_0 + \frac{1}{2}(x^T x + w_0^T \Lambda_0 w_0 - w_n^T \Lambda_n w_n)
         \end{align*}
@@ -562,30 +811,60 @@ class BayesianLinReg(ConjPrior):
         self.Lambda_0 = np.array([[0, 0], [0, 1]]) + _epsilon
         self.alpha = 1 + _epsilon
         self.beta = _epsilon
+        self._log_normalizer_cache = None
         super().__init__(sample=sample)
 
-    def update(self, x):
-        t, x = self.process_time_series(x)
-        t_full = np.stack((t, np.ones_like(t)), axis=-1)  # [t, 2]
+    def _sigma2_hat(self):
+        r"""
+        :return: the posterior mean of :math:`\sigma^2`, i.e. the mean :math:`\beta / (\alpha - 1)` of
+            :math:`\mathrm{InvGamma}(\alpha, \beta)`.
+        """
+        if self.alpha <= 1:
+            raise ValueError(f"The posterior mean of sigma^2 is undefined for alpha = {self.alpha} <= 1.")
+        return self.beta / (self.alpha - 1)
+
+    def _posterior_params(self, t, x):
+        """
+        :return: ``(n, alpha, beta, Lambda_0, w_0)`` obtained by updating the model on the already processed data
+            ``(t, x)``. Does not modify the model itself.
+        """
+        x = x.flatten()
+        t_full = _design_matrix(t)  # [t, 2]
 
         # Initial prediction
-        self.w_0 = self.w_0.reshape((2, 1))
-        pred0 = self.w_0.T @ self.Lambda_0 @ self.w_0
+        pred0 = self.w_0 @ self.Lambda_0 @ self.w_0
 
         # Update predictive coefficients & uncertainty
         design = t_full.T @ t_full
-        ols = pinv(t_full) @ x
-        self.w_0 = pinvh(self.Lambda_0 + design) @ (self.Lambda_0 @ self.w_0 + design @ ols)
-        self.Lambda_0 = self.Lambda_0 + design
+        Lambda_n = self.Lambda_0 + design
+        w_n = _inv2x2(Lambda_n) @ (self.Lambda_0 @ self.w_0 + t_full.T @ x)
 
         # Updated prediction
-        pred = self.w_0.T @ self.Lambda_0 @ self.w_0
-        self.w_0 = self.w_0.flatten()
+        pred = w_n @ Lambda_n @ w_n
 
         # Update accumulators
-        self.n = self.n + len(x)
-        self.alpha = self.alpha + len(x) / 2
-        self.beta = self.beta + (x.T @ x + pred0 - pred).item() / 2
+        n = self.n + len(x)
+        alpha = self.alpha + len(x) / 2
+        beta = self.beta + (x @ x + pred0 - pred) / 2
+        return n, alpha, beta, Lambda_n, w_n
+
+    def update(self, x):
+        t, x = self.process_time_series(x)
+        self.n, self.alpha, self.beta, self.Lambda_0, self.w_0 = self._posterior_params(t, x)
+
+    def _log_normalizer(self):
+        r"""
+        :return: :math:`\frac{1}{2} \log \det \Lambda_0 + \alpha \log \beta - \log \Gamma(\alpha)` for the current
+            parameters. The terms depending on :math:`\alpha, \beta` are cached, since `posterior_explicit` is often
+            called repeatedly between updates. The log determinant is cheap, so we recompute it on every call.
+        """
+        # Cast to float, since parameters loaded by from_dict are 0-d arrays which the numba kernel can't accept
+        key = (float(self.alpha), float(self.beta))
+        cache = getattr(self, "_log_normalizer_cache", None)
+        if cache is None or cache[0] != key:
+            cache = (key, _linreg_log_normalizer(*key))
+            self._log_normalizer_cache = cache
+        return _logdet2x2(self.Lambda_0) / 2 + cache[1]
 
     def posterior_explicit(self, x, return_rv=False, log=True, return_updated=False):
         r"""
@@ -604,15 +883,63 @@ class BayesianLinReg(ConjPrior):
                 "Bayesian linear regression doesn't have a scipy.stats random variable posterior. "
                 "Please specify a non-``None`` value of ``x`` and set ``return_rv = False``."
             )
-        updated = copy.deepcopy(self)
-        updated.update(x)
         t, x_np = self.process_time_series(x)
-        a = -len(x_np) / 2 * np.log(2 * np.pi)
-        b = (np.linalg.slogdet(self.Lambda_0)[1] - np.linalg.slogdet(updated.Lambda_0)[1]) / 2
-        c = self.alpha * np.log(self.beta) - updated.alpha * np.log(updated.beta)
-        d = gammaln(updated.alpha) - gammaln(self.alpha)
-        ret = (a + b + c + d if log else np.exp(a + b + c + d)).reshape(1)
-        return (ret, updated) if return_updated else ret
+        n, alpha, beta, Lambda_0, w_0 = self._posterior_params(t, x_np)
+        key = (float(alpha), float(beta))
+        log_normalizer = _linreg_log_normalizer(*key)
+        logp = -len(x_np) / 2 * np.log(2 * np.pi) + self._log_normalizer() - _logdet2x2(Lambda_0) / 2 - log_normalizer
+        ret = np.array([logp if log else np.exp(logp)])
+        if return_updated:
+            cache = (key, log_normalizer)
+            params = dict(n=n, alpha=alpha, beta=beta, Lambda_0=Lambda_0, w_0=w_0, _log_normalizer_cache=cache)
+            return ret, self._copy_with(**params)
+        return ret
+
+    def streaming_posterior(self, x, log=True, return_updated=False):
+        r"""
+        Predictive posterior (log) PDF of each observation :math:`(t_k, x_k)` in ``x``, conditioned on all the
+        observations before it. This is equivalent to calling `posterior_explicit` on each observation in turn, and
+        updating the model on that observation afterwards. However, since the update rule only depends on the
+        sufficient statistics :math:`T^T T, T^T x, x^T x, n`, we can use their prefix sums to evaluate all
+        :math:`n` posteriors in a single vectorized pass.
+
+        :param x: observations to evaluate the streaming posterior at
+        :param log: whether to return the log PDF (instead of the PDF)
+        :param return_updated: whether to return the conjugate prior updated on all of ``x`` as well
+        """
+        t, x_np = self.process_time_series(x)
+        x_np = x_np.flatten()
+        k = np.arange(1, len(x_np) + 1)
+
+        # Posterior precision Lambda_k = Lambda_0 + T_k^T T_k for each prefix of the data
+        l00 = self.Lambda_0[0, 0] + np.cumsum(t * t)
+        l01 = self.Lambda_0[0, 1] + np.cumsum(t)
+        l10 = self.Lambda_0[1, 0] + np.cumsum(t)
+        l11 = self.Lambda_0[1, 1] + k
+        det = l00 * l11 - l01 * l10
+
+        # w_k^T Lambda_k w_k = r_k^T Lambda_k^{-1} r_k, where r_k = Lambda_0 w_0 + T_k^T x_k
+        r = self.Lambda_0 @ self.w_0
+        r0, r1 = r[0] + np.cumsum(t * x_np), r[1] + np.cumsum(x_np)
+        pred = (l11 * r0 * r0 - (l01 + l10) * r0 * r1 + l00 * r1 * r1) / det
+        pred0 = self.w_0 @ self.Lambda_0 @ self.w_0
+
+        # Parameters after each prefix of the data, prepended by the current parameters
+        logdet = np.concatenate(([_logdet2x2(self.Lambda_0)], np.log(det)))
+        alpha = np.concatenate(([self.alpha], self.alpha + k / 2))
+        beta = np.concatenate(([self.beta], self.beta + (np.cumsum(x_np * x_np) + pred0 - pred) / 2))
+
+        a = -np.log(2 * np.pi) / 2
+        b = -np.diff(logdet) / 2
+        c = -np.diff(alpha * np.log(beta))
+        d = np.diff(gammaln(alpha))
+        ret = a + b + c + d if log else np.exp(a + b + c + d)
+        if return_updated:
+            Lambda_0 = np.array([[l00[-1], l01[-1]], [l10[-1], l11[-1]]])
+            w_0 = _inv2x2(Lambda_0) @ np.array([r0[-1], r1[-1]])
+            updated = self._copy_with(n=self.n + len(x_np), alpha=alpha[-1], beta=beta[-1], Lambda_0=Lambda_0, w_0=w_0)
+            return ret, updated
+        return ret
 
     def posterior(self, x, return_rv=False, log=True, return_updated=False):
         r"""
@@ -636,25 +963,24 @@ class BayesianLinReg(ConjPrior):
         t, x_np = self.process_time_series(x)
 
         # Get priors & MAP estimates for sigma^2 and w; get the MAP estimate for x(t)
-        prior_sigma2 = invgamma(a=self.alpha, scale=self.beta)
-        sigma2_hat = prior_sigma2.mean()
-        prior_w = mvnorm(self.w_0, sigma2_hat * pinvh(self.Lambda_0), allow_singular=True)
+        sigma2_hat = self._sigma2_hat()
+        prior_w = mvnorm(self.w_0, sigma2_hat * _inv2x2(self.Lambda_0), allow_singular=True)
         w_hat = self.w_0
-        xhat = np.stack((t, np.ones_like(t)), axis=-1) @ w_hat
+        xhat = _design_matrix(t) @ w_hat
 
         # Get posteriors
-        updated = copy.deepcopy(self)
-        updated.update(x)
-        post_sigma2 = invgamma(a=updated.alpha, scale=updated.beta)
-        post_w = mvnorm(updated.w_0, sigma2_hat * pinvh(updated.Lambda_0), allow_singular=True)
+        n, alpha, beta, Lambda_0, w_0 = self._posterior_params(t, x_np)
+        post_w = mvnorm(w_0, sigma2_hat * _inv2x2(Lambda_0), allow_singular=True)
 
         # Apply Bayes' rule
         evidence = norm(xhat, np.sqrt(sigma2_hat)).logpdf(x_np.flatten()).reshape(len(x_np))
-        prior = prior_sigma2.logpdf(sigma2_hat) + prior_w.logpdf(w_hat)
-        post = post_sigma2.logpdf(sigma2_hat) + post_w.logpdf(w_hat)
+        prior = _invgamma_logpdf(sigma2_hat, a=self.alpha, b=self.beta) + prior_w.logpdf(w_hat)
+        post = _invgamma_logpdf(sigma2_hat, a=alpha, b=beta) + post_w.logpdf(w_hat)
         logp = evidence + prior.item() - post.item()
         ret = logp if log else np.exp(logp)
-        return (ret, updated) if return_updated else ret
+        if return_updated:
+            return ret, self._copy_with(n=n, alpha=alpha, beta=beta, Lambda_0=Lambda_0, w_0=w_0)
+        return ret
 
     def forecast(self, time_stamps) -> Tuple[TimeSeries, TimeSeries]:
         name = self.names[0]
@@ -664,9 +990,9 @@ class BayesianLinReg(ConjPrior):
         if self.dt is None:
             self.dt = t[-1] - t[0] if len(t) > 1 else 1
         t = (t - self.t0) / self.dt
-        t_full = np.stack((t, np.ones_like(t)), axis=-1)  # [t, 2]
-        sigma2_hat = invgamma(a=self.alpha, scale=self.beta).mean()
-        w_cov = sigma2_hat * pinvh(self.Lambda_0)  # cov of [m, b]
+        t_full = _design_matrix(t)  # [t, 2]
+        sigma2_hat = self._sigma2_hat()
+        w_cov = sigma2_hat * _inv2x2(self.Lambda_0)  # cov of [m, b]
 
         # x = m t + b = [t, 1] @ [m, b]
         xhat = t_full @ self.w_0
@@ -732,24 +1058,35 @@ class BayesianMVLinReg(ConjPrior):
             self.w_0 = np.zeros((2, d))
         return t, x
 
-    def update(self, x):
-        t, x = self.process_time_series(x)
-        n, d = x.shape
+    def _Sigma_hat(self):
+        r"""
+        :return: the posterior mean of :math:`\Sigma`, i.e. the mean :math:`V_0 / (\nu - d - 1)` of
+            :math:`\mathrm{InvWishart}_{\nu}(V_0)`.
+        """
+        if self.nu <= self.dim + 1:
+            raise ValueError(f"The posterior mean of Sigma is undefined for nu = {self.nu} <= d + 1 = {self.dim + 1}.")
+        return self.V_0 / (self.nu - self.dim - 1)
 
-        t_full = np.stack((t, np.ones_like(t)), axis=-1)  # [n, 2]
+    def _posterior_params(self, t, x):
+        """
+        :return: ``(n, nu, V_0, Lambda_0, w_0)`` obtained by updating the model on the already processed data
+            ``(t, x)``. Does not modify the model itself.
+        """
+        t_full = _design_matrix(t)  # [n, 2]
         design = t_full.T @ t_full
         new_Lambda = design + self.Lambda_0
-        new_w = pinvh(new_Lambda) @ (t_full.T @ x + self.Lambda_0 @ self.w_0)
+        new_w = _inv2x2(new_Lambda) @ (t_full.T @ x + self.Lambda_0 @ self.w_0)
 
-        self.n = self.n + len(x)
-        self.nu = self.nu + len(x)
+        # We use the residuals rather than the equivalent form V_0 + X^T X + W_0^T Lambda_0 W_0 - W_n^T Lambda_n W_n,
+        # which suffers from catastrophic cancellation when the data is far from the origin
         residual = x - t_full @ new_w  # [n, d]
         delta_w = new_w - self.w_0  # [2, d]
-        residual_squared = residual.T @ residual
-        delta_w_quad_form = (delta_w.T @ self.Lambda_0) @ delta_w
-        self.V_0 = self.V_0 + residual_squared + delta_w_quad_form
-        self.w_0 = new_w
-        self.Lambda_0 = new_Lambda
+        new_V = self.V_0 + residual.T @ residual + (delta_w.T @ self.Lambda_0) @ delta_w
+        return self.n + len(x), self.nu + len(x), new_V, new_Lambda, new_w
+
+    def update(self, x):
+        t, x = self.process_time_series(x)
+        self.n, self.nu, self.V_0, self.Lambda_0, self.w_0 = self._posterior_params(t, x)
 
     def posterior_explicit(self, x, return_rv=False, log=True, return_updated=False):
         r"""
@@ -768,22 +1105,23 @@ class BayesianMVLinReg(ConjPrior):
                 "Bayesian linear regression doesn't have a scipy.stats random variable posterior. "
                 "Please specify a non-``None`` value of ``x`` and set ``return_rv = False``."
             )
-        updated = copy.deepcopy(self)
-        updated.update(x)
         t, x_np = self.process_time_series(x)
+        n, nu, V_0, Lambda_0, w_0 = self._posterior_params(t, x_np)
 
         # Compute log pseudo-determinant of V_0 / 2 (for both current and updated values)
         logdet_V = np.linalg.slogdet(self.V_0 / 2)[1]
         logdet_V = _log_pdet(self.V_0 / 2) if np.isinf(logdet_V) else logdet_V
-        logdet_V_new = np.linalg.slogdet(updated.V_0 / 2)[1]
-        logdet_V_new = _log_pdet(updated.V_0 / 2) if np.isinf(logdet_V_new) else logdet_V_new
+        logdet_V_new = np.linalg.slogdet(V_0 / 2)[1]
+        logdet_V_new = _log_pdet(V_0 / 2) if np.isinf(logdet_V_new) else logdet_V_new
 
         a = -len(x_np) / 2 * self.dim * np.log(2 * np.pi)
-        b = (np.linalg.slogdet(self.Lambda_0)[1] - np.linalg.slogdet(updated.Lambda_0)[1]) / 2
-        c = (self.nu * logdet_V - updated.nu * logdet_V_new) / 2
-        d = multigammaln(updated.nu / 2, self.dim) - multigammaln(self.nu / 2, self.dim)
+        b = (_logdet2x2(self.Lambda_0) - _logdet2x2(Lambda_0)) / 2
+        c = (self.nu * logdet_V - nu * logdet_V_new) / 2
+        d = multigammaln(nu / 2, self.dim) - multigammaln(self.nu / 2, self.dim)
         ret = (a + b + c + d if log else np.exp(a + b + c + d)).reshape(1)
-        return (ret, updated) if return_updated else ret
+        if return_updated:
+            return ret, self._copy_with(n=n, nu=nu, V_0=V_0, Lambda_0=Lambda_0, w_0=w_0)
+        return ret
 
     def posterior(self, x, return_rv=False, log=True, return_updated=False):
         r"""
@@ -808,25 +1146,24 @@ class BayesianMVLinReg(ConjPrior):
 
         # Get priors & MAP estimates for Sigma and W; get the MAP estimate for x(t)
         prior_Sigma = invwishart(df=self.nu, scale=self.V_0)
-        Sigma_hat = prior_Sigma.mean()
-        w_hat = self.w_0.flatten()
-        prior_w = mvnorm(w_hat, np.kron(Sigma_hat, pinvh(self.Lambda_0)), allow_singular=True)
-        xhat = np.stack((t, np.ones_like(t)), axis=-1) @ w_hat.reshape(2, -1)
+        Sigma_hat = self._Sigma_hat()
+        w_hat = self.w_0
+        xhat = _design_matrix(t) @ w_hat
 
         # Get posteriors
-        updated = copy.deepcopy(self)
-        updated.update(x)
-        post_Sigma = invwishart(df=updated.nu, scale=updated.V_0)
-        post_w = mvnorm(updated.w_0.flatten(), np.kron(Sigma_hat, pinvh(updated.Lambda_0)), allow_singular=True)
+        n, nu, V_0, Lambda_0, w_0 = self._posterior_params(t, x_np)
+        post_Sigma = invwishart(df=nu, scale=V_0)
 
         # Apply Bayes' rule
         evidence = mvnorm(cov=Sigma_hat, allow_singular=True).logpdf(x_np - xhat).reshape(len(x_np))
-        prior = prior_Sigma.logpdf(Sigma_hat) + prior_w.logpdf(w_hat)
-        post = post_Sigma.logpdf(Sigma_hat) + post_w.logpdf(w_hat)
+        prior = prior_Sigma.logpdf(Sigma_hat) + _matrix_normal_logpdf(w_hat, self.w_0, self.Lambda_0, Sigma_hat)
+        post = post_Sigma.logpdf(Sigma_hat) + _matrix_normal_logpdf(w_hat, w_0, Lambda_0, Sigma_hat)
         logp = evidence + prior - post
 
         ret = logp if log else np.exp(logp)
-        return (ret, updated) if return_updated else ret
+        if return_updated:
+            return ret, self._copy_with(n=n, nu=nu, V_0=V_0, Lambda_0=Lambda_0, w_0=w_0)
+        return ret
 
     def forecast(self, time_stamps) -> Tuple[TimeSeries, TimeSeries]:
         names = self.names
@@ -836,9 +1173,9 @@ class BayesianMVLinReg(ConjPrior):
         if self.dt is None:
             self.dt = t[-1] - t[0] if len(t) > 1 else 1
         t = (t - self.t0) / self.dt
-        t_full = np.stack((t, np.ones_like(t)), axis=-1)  # [t, 2]
+        t_full = _design_matrix(t)  # [t, 2]
 
-        Sigma_hat = invwishart(df=self.nu, scale=self.V_0).mean().reshape((self.dim, self.dim))
+        Sigma_hat = self._Sigma_hat()
 
         # x = m t + b = [t, 1] @ [m, b]
         xhat = t_full @ self.w_0
@@ -857,7 +1194,7 @@ class BayesianMVLinReg(ConjPrior):
         #
         # Therefore, we first compute the diagonal of (V @ \Lambda^{-1} @ V^T)
         # using the trick (A @ B)_ii = sum_j A_ij B_ji:
-        x_Lambda_diag = np.sum((t_full @ pinvh(self.Lambda_0)) * t_full, axis=-1)
+        x_Lambda_diag = np.sum((t_full @ _inv2x2(self.Lambda_0)) * t_full, axis=-1)
 
         # Now we can compute the full variances of the prediction
         sigma2 = np.outer(Sigma_hat.diagonal(), x_Lambda_diag).reshape(xhat.shape)
@@ -43,6 +43,7 @@ setup(
         "GitPython",
         "py4j",
         "matplotlib",
+        "numba",
         "numpy>=1.21; python_version >= '3.7'",  # 1.21 remediates a security risk
         "numpy>=1.19; python_version < '3.7'",  # however, numpy 1.20+ requires python 3.7+
         "packaging",
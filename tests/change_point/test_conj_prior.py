@@ -9,10 +9,12 @@ from packaging import version
 import sys
 import unittest
 
+from numba import njit
 import numpy as np
 import scipy
 
 from merlion.utils.conj_priors import BetaBernoulli, NormInvGamma, MVNormInvWishart, BayesianLinReg, BayesianMVLinReg
+from merlion.utils.conj_priors import nig_logpdf, nig_update
 from merlion.utils.time_series import TimeSeries, UnivariateTimeSeries
 
 logger = logging.getLogger(__name__)
@@ -45,6 +47,11 @@ class TestConjugatePriors(unittest.TestCase):
             pred = dist_ts.posterior(TimeSeries.from_pd([0, 1]), log=False)
             self.assertAlmostEqual(np.max(np.abs(pred - expected)), 0, places=6)
 
+        # Make sure invalid inputs are handled like scipy.stats.bernoulli.logpmf, i.e. nan for nan & -inf otherwise
+        pred = BetaBernoulli([1, 0]).posterior([np.nan, 0.5, 2.0])
+        self.assertTrue(np.isnan(pred[0]))
+        self.assertTrue(np.all(pred[1:] == -np.inf))
+
     def test_normal(self):
         print()
         logger.info("test_normal\n" + "-" * 80 + "\n")
@@ -79,6 +86,31 @@ class TestConjugatePriors(unittest.TestCase):
                 self.assertAlmostEqual(np.max([np.abs(np.array(x) - mu) for t, x in xhat_m]), 0, delta=0.05)
                 self.assertAlmostEqual(np.max([np.abs(np.array(s) - sigma) for t, s in sigma_m]), 0, delta=0.05)
 
+    def test_numba_kernels(self):
+        print()
+        logger.info("test_numba_kernels\n" + "-" * 80 + "\n")
+
+        @njit
+        def streaming_logp(state, x):
+            logp = np.empty(len(x))
+            for i in range(len(x)):
+                logp[i] = nig_logpdf(state, x[i : i + 1])[0]
+                state = nig_update(state, x[i : i + 1])
+            return logp, state
+
+        # Make sure a numba-compiled streaming loop agrees with the object-oriented interface
+        data = np.random.randn(200) * 2 + 5
+        dist = NormInvGamma(data[:100])
+        logp, (n, mu_0, alpha, beta) = streaming_logp((dist.n, float(dist.mu_0), dist.alpha, dist.beta), data[100:])
+        expected = []
+        for x in data[100:]:
+            p, dist = dist.posterior(np.array([x]), return_updated=True)
+            expected.append(p)
+        self.assertAlmostEqual(np.abs(logp - np.concatenate(expected)).max(), 0, places=6)
+        self.assertEqual(n, dist.n)
+        self.assertAlmostEqual(mu_0, dist.mu_0, places=6)
+        self.assertAlmostEqual(beta, dist.beta, places=6)
+
     def test_mv_normal(self):
         print()
         logger.info("test_mv_normal\n" + "-" * 80 + "\n")
@@ -101,6 +133,24 @@ class TestConjugatePriors(unittest.TestCase):
         zscores = (xhat.to_pd() - data[-50000:].to_pd()) / stderr.to_pd().values
         self.assertAlmostEqual(zscores.pow(2).mean().max(), 1, delta=0.02)
 
+        # Make sure prior hyperparameters set before the first update are respected
+        dist = MVNormInvWishart()
+        dist.nu, dist.Lambda = d + 1, np.eye(d)
+        dist.update(data[:5])
+        self.assertEqual(dist.nu, d + 6)
+        self.assertAlmostEqual(np.linalg.eigvalsh(dist.Lambda).min(), 1, delta=1e-6)
+
+        # Make sure both batch & streaming updates are numerically stable for data with a large offset & a small
+        # noise, i.e. Lambda stays close to the scatter matrix of the data about its mean
+        x = 1e6 + np.random.randn(3000, 2) * 0.01
+        scatter = (x - x.mean(axis=0)).T @ (x - x.mean(axis=0))
+        dist = MVNormInvWishart(x)
+        self.assertAlmostEqual(np.abs(dist.Lambda - scatter).max() / np.abs(scatter).max(), 0, places=6)
+        dist = MVNormInvWishart()
+        for i in range(len(x)):
+            dist.update(x[i : i + 1])
+        self.assertAlmostEqual(np.abs(dist.Lambda - scatter).max() / np.abs(scatter).max(), 0, places=6)
+
     def test_bayesian_linreg(self):
         print()
         logger.info("test_bayesian_linreg\n" + "-" * 80 + "\n")
@@ -138,6 +188,28 @@ class TestConjugatePriors(unittest.TestCase):
         explicit_uni = np.concatenate([uni.posterior_explicit(x_test[i : i + 1]) for i in range(100)])
         self.assertAlmostEqual(np.abs(naive_uni - explicit_uni).max(), 0, places=6)
 
+        # Make sure streaming version agrees with explicit version applied to each point in turn
+        streaming_uni, updated = uni.streaming_posterior(x_test[:100], return_updated=True)
+        explicit_uni, explicit_updated = [], uni
+        for i in range(100):
+            p, explicit_updated = explicit_updated.posterior_explicit(x_test[i : i + 1], return_updated=True)
+            explicit_uni.append(p)
+        self.assertAlmostEqual(np.abs(streaming_uni - np.concatenate(explicit_uni)).max(), 0, places=6)
+        self.assertAlmostEqual(np.abs(updated.w_0 - explicit_updated.w_0).max(), 0, places=6)
+        self.assertAlmostEqual(updated.beta, explicit_updated.beta, places=6)
+
+        # Make sure the explicit posterior still works after serializing & deserializing the model
+        loaded = BayesianLinReg.from_dict(uni.to_dict())
+        loaded_uni = np.concatenate([loaded.posterior_explicit(x_test[i : i + 1]) for i in range(100)])
+        explicit_uni = np.concatenate([uni.posterior_explicit(x_test[i : i + 1]) for i in range(100)])
+        self.assertAlmostEqual(np.abs(loaded_uni - explicit_uni).max(), 0, places=6)
+
+        # Make sure the explicit posterior reflects hyperparameters which are changed between calls
+        loaded.Lambda_0 = loaded.Lambda_0 * 10
+        cached = loaded.posterior_explicit(x_test[:1])
+        fresh = BayesianLinReg.from_dict(loaded.to_dict()).posterior_explicit(x_test[:1])
+        self.assertAlmostEqual(np.abs(cached - fresh).max(), 0, places=6)
+
         # Make sure explicit version agrees with naive version (multivariate)
         naive_multi = np.concatenate([multi.posterior(x_test[i : i + 1]) for i in range(100)])
         explicit_multi = np.concatenate([multi.posterior_explicit(x_test[i : i + 1]) for i in range(100)])
@@ -178,6 +250,25 @@ class TestConjugatePriors(unittest.TestCase):
             zscores = (xhat.to_pd() - x_test) / stderr.to_pd().values
             self.assertAlmostEqual(zscores.pow(2).mean().max(), 1, delta=0.02)
 
+        # Make sure streaming updates are numerically stable for data with a large offset & a small noise. The
+        # smallest eigenvalue of V_0 should be close to the residual sum of squares.
+        n, sigma = 3000, 0.01
+        x = 1e6 + 0.5 * np.arange(n).reshape(-1, 1) + np.random.randn(n, 2) * sigma
+        dist = BayesianMVLinReg()
+        for i in range(n):
+            dist.update(x[i : i + 1])
+        self.assertAlmostEqual(np.linalg.eigvalsh(dist.V_0).min(), n * sigma ** 2, delta=0.05)
+
+        # Make sure explicit & naive versions agree for multivariate data when the model has only seen a few points,
+        # i.e. when the density of the weights has a non-negligible contribution to the naive posterior
+        for d in [2, 3, 5]:
+            t = np.arange(40).reshape(-1, 1)
+            x = 0.3 * t + np.arange(d) + np.random.randn(40, d)
+            dist = BayesianMVLinReg(x[:20])
+            naive = np.concatenate([dist.posterior(x[i : i + 1]) for i in range(20, 40)])
+            explicit = np.concatenate([dist.posterior_explicit(x[i : i + 1]) for i in range(20, 40)])
+            self.assertAlmostEqual(np.abs(naive - explicit).max(), 0, delta=0.5)
+
 
 if __name__ == "__main__":
     logging.basicConfig(